@@ -24,8 +24,25 @@ import os
 # Configuration settings for the data processing pipeline
 API_URL = "https://data.cincinnati-oh.gov/resource/qhw6-ujsg.json"
 DATA_DIR = "data/raw"
+VALIDATED_DIR = "data/validated"
+# Invalid records; may be an S3 prefix, e.g. QUARANTINE_DIR=s3://hydrant-data-lake/quarantine
+QUARANTINE_DIR = os.environ.get("QUARANTINE_DIR", "data/quarantine")
 PROCESSED_DIR = "data/processed"
 
-# Ensure data directories exist
-os.makedirs(DATA_DIR, exist_ok=True)        
-os.makedirs(PROCESSED_DIR, exist_ok=True)
+# API paging: rows per request and number of pages downloaded concurrently
+PAGE_SIZE = 50000
+FETCH_WORKERS = 8
+
+# AWS region of the data lake bucket (used for any s3:// path)
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
+
+
+def ensure_dirs():
+    """
+    Create the local data directories if they don't exist.
+    Called once per pipeline run (not at import, so importing config has no side effects).
+    S3 prefixes are skipped (no directories to create).
+    """
+    for path in (DATA_DIR, VALIDATED_DIR, QUARANTINE_DIR, PROCESSED_DIR):
+        if not path.startswith("s3://"):
+            os.makedirs(path, exist_ok=True)
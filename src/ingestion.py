@@ -18,39 +18,270 @@ VERSION HISTORY:
 - v1.0: Initial version created on 2024-06-15 by Lora Covrett
 ====================================================================================================    
 """
+import gzip
+import logging
 import requests
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
-from config import API_URL, DATA_DIR
+from requests.adapters import HTTPAdapter
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from alerts import send_alert
+from config import API_URL, DATA_DIR, FETCH_WORKERS, PAGE_SIZE
+from io_utils import load_records
 from logging_config import setup_logging
 
 # Initialize module-level logger
 # AWS Migration: CloudWatch Logs with structured JSON logging
 logger = setup_logging(name="ingestion")
 
+# Shared HTTP session for all API calls made by this process
+# 
+# Reusing one Session keeps TCP/TLS connections alive in the adapter's pool, so repeat
+# fetches (warm Lambda invocations, retries) skip the DNS + TCP + TLS handshake.
+# 
+# Retry Configuration (handled inside urllib3, before the response reaches our code):
+# - total=3: Up to 3 retries on connection errors and retryable status codes
+# - backoff_factor=0.5: Exponential backoff between attempts (0.5s, 1s, 2s)
+# - status_forcelist: Rate limiting (429) and transient server errors (5xx)
+# - raise_on_status=False: Hand back the final response so raise_for_status()
+#   still surfaces exhausted retries as an HTTPError
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+))
+
+# Timeouts for every API call
+# - 3.05s connect: Fail fast if the API host can't be reached
+# - 30s read: Allow up to 30s between bytes once connected
+TIMEOUT = (3.05, 30)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker for the Open Data API.
+
+    closed    -> open after `threshold` consecutive failed calls
+    open      -> half-open once `reset_after` seconds have passed; one probe call is let through
+    half-open -> closed if the probe succeeds, open again if it fails
+                 (another probe is let through if the last one never reported back)
+
+    While open, calls fail immediately with CircuitOpen and no socket is touched,
+    so a struggling upstream isn't hammered by every retry of every page.
+    """
+
+    def __init__(self, threshold=5, reset_after=60):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go out now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half-open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.threshold:
+                tripped = self.state != "open"
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            else:
+                tripped = False
+        if tripped:
+            send_alert(f"Open Data API circuit breaker opened after {self.failures} consecutive failures.")
+
+
+_BREAKER = CircuitBreaker()
+
+
+def _guarded(call):
+    """
+    Run one API call through the circuit breaker.
+    Parameters:
+    - call (callable): Zero-argument function that performs the request
+    Returns:
+        The result of call().
+    """
+    if not _BREAKER.allow():
+        raise CircuitOpen(f"API circuit breaker open; retrying after {_BREAKER.reset_after}s cool-down")
+    # Any exception counts as a failure, not just RequestException: a probe that dies
+    # writing the page (OSError) or parsing the reply (KeyError) must still resolve
+    # the half-open state
+    try:
+        result = call()
+    except Exception:
+        _BREAKER.record_failure()
+        raise
+    _BREAKER.record_success()
+    return result
+
+
+# Retry policy for whole API calls, layered over urllib3's per-request retries
+# 
+# urllib3 only retries before a response starts; this also covers a body that times out
+# or drops mid-stream (_fetch_page re-raises those urllib3 errors as ReadTimeout /
+# ChunkedEncodingError). CircuitOpen is not retried, so an open breaker fails fast.
+# - stop_after_attempt(3): At most 3 attempts per call
+# - wait_random_exponential: Jittered exponential backoff (up to 10s) to avoid retry storms
+# - reraise=True: Surface the original requests exception to fetch_data's handlers
+_api_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_random_exponential(multiplier=1, max=10),
+    retry=retry_if_exception_type((
+        requests.exceptions.Timeout,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError
+    )),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+
+
+@_api_retry
+def _count_rows():
+    """
+    Ask the API how many rows the dataset currently holds.
+    Returns:
+        int: Total row count reported by Socrata.
+    """
+    def call():
+        response = _SESSION.get(API_URL, params={"$select": "count(*) AS total"}, timeout=TIMEOUT)
+        response.raise_for_status()
+        return int(response.json()[0]["total"])
+
+    return _guarded(call)
+
+
+@_api_retry
+def _fetch_page(offset, path):
+    """
+    Download one page of the dataset and stream it to disk.
+    Parameters:
+    - offset (int): Row offset of the page ($offset)
+    - path (str): Shard file to write the page to
+    Returns:
+        int: Number of bytes written.
+    """
+    def call():
+        # Request Configuration:
+        # - $limit/$offset: One PAGE_SIZE slice of the dataset
+        # - $order=:id: Stable row order so pages never overlap or skip rows
+        # - stream=True: Body stays on the socket until read below, so the payload
+        #   is never buffered in memory as a decoded Python string
+        # - Accept-Encoding: gzip: JSON compresses ~5-10x, and the gzip body is kept as is
+        params = {"$limit": PAGE_SIZE, "$offset": offset, "$order": ":id"}
+        headers = {"Accept-Encoding": "gzip"}
+        with _SESSION.get(API_URL, params=params, headers=headers, stream=True, timeout=TIMEOUT) as response:
+
+            # Raise exception for HTTP error responses (4xx, 5xx status codes)
+            # This ensures we don't save error pages as valid data
+            response.raise_for_status()
+
+            # Stream the gzip-compressed page to the shard file
+            # Mode 'wb' = binary write, copied in 64 KiB chunks so peak memory stays flat
+            # - gzip response: decode_content=False, the bytes are saved exactly as received
+            # - Anything else: decoded by urllib3 and gzip-compressed on the way to disk,
+            #   so every shard is gzip either way
+            # 
+            # Reading response.raw directly raises urllib3's own exceptions, so a body that
+            # stalls or drops mid-stream is re-raised as the requests exception
+            # requests.iter_content would have raised (retried by _api_retry)
+            try:
+                with open(path, 'wb') as f:
+                    if response.headers.get("Content-Encoding") == "gzip":
+                        response.raw.decode_content = False
+                        shutil.copyfileobj(response.raw, f, length=1 << 16)
+                    else:
+                        response.raw.decode_content = True
+                        with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                            shutil.copyfileobj(response.raw, gz, length=1 << 16)
+                    return f.tell()
+            except ReadTimeoutError as e:
+                raise requests.exceptions.ReadTimeout(e) from e
+            except ProtocolError as e:
+                raise requests.exceptions.ChunkedEncodingError(e) from e
+
+    return _guarded(call)
+
+
+def _merge_pages(parts, filename):
+    """
+    Combine gzip page shards (each a JSON array) into a single gzip JSON array file.
+    Parameters:
+    - parts (list): Shard file paths in page order
+    - filename (str): Path of the combined file
+    """
+    # Single page (the common case): nothing to combine, the API's gzip bytes are kept
+    if len(parts) == 1:
+        os.replace(parts[0], filename)
+        return
+
+    # Pages are decompressed one at a time and their items re-compressed into one array
+    with gzip.open(filename, 'wb') as out:
+        out.write(b"[")
+        wrote_items = False
+        for part in parts:
+            with gzip.open(part, 'rb') as f:
+                page = f.read()
+
+            # Items between the enclosing brackets; skip empty pages ("[]")
+            items = memoryview(page)[page.index(b"[") + 1:page.rindex(b"]")]
+            if not bytes(items[:64]).strip():
+                continue
+            if wrote_items:
+                out.write(b",")
+            out.write(items)
+            wrote_items = True
+        out.write(b"]")
+
+    for part in parts:
+        os.remove(part)
+
+
 def fetch_data():
     """
     Fetch data from Cincinnati Open Data API and save to local file system.
+
+    The dataset is downloaded in PAGE_SIZE pages ($limit/$offset) fetched concurrently,
+    plus further pages until one comes back short, then combined into a single gzip-compressed JSON array file.
     Returns:
         str: Path to the saved data file.
         
     """
     logger.info("Starting data ingestion process.")
     try:
-    
-        # Make HTTP GET request to Cincinnati Open Data API
-        # 
-        # Request Configuration:
-        # - timeout=30: Prevents hanging on slow networks (fail fast principle)
-        # - No auth headers currently needed (public API)
-        # 
-        # AWS Migration: Add retry decorator
-        # @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-        response = requests.get(API_URL, timeout=30)
-
-        # Raise exception for HTTP error responses (4xx, 5xx status codes)
-        # This ensures we don't save error pages as valid data
-        response.raise_for_status()
 
         # Create ISO 8601 UTC timestamp for file naming
         # Format: YYYYMMDDTHHMMSSZ (Z indicates UTC timezone)
@@ -59,35 +290,70 @@ def fetch_data():
         ts=datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
 
         # Build file path with timestamp for versioning
-        # Pattern: {DATA_DIR}/firehydrants_{TIMESTAMP}.json
-        # Example: firehydrants_20231005T142530Z.json
+        # Pattern: {DATA_DIR}/firehydrants_{TIMESTAMP}.json.gz
+        # Example: firehydrants_20231005T142530Z.json.gz
+        # Stored gzip-compressed as downloaded (see _fetch_page); validation reads it directly
         # 
         # AWS Migration: Change to S3 key structure
-        # S3 Key: raw/year=2025/month=01/day=12/firehydrants_20250112T143000Z.json
+        # S3 Key: raw/year=2025/month=01/day=12/firehydrants_20250112T143000Z.json.gz
         # This enables partition pruning in Athena for faster queries
-        filename = f"{DATA_DIR}/firehydrants_{ts}.json"
+        filename = f"{DATA_DIR}/firehydrants_{ts}.json.gz"
 
-        # Write raw API response to local file system
-        # Mode 'w' = write (create new file or overwrite existing)
-        # 
-        # AWS Migration: Replace with S3 upload using boto3
-        with open(filename, 'w') as f:
-            f.write(response.text)
+        # Plan the pages up front from the dataset row count
+        # Without $limit the API silently caps responses at 1000 rows
+        # An empty dataset still fetches one page so the output is a valid "[]"
+        total = _count_rows()
+        offsets = list(range(0, max(total, 1), PAGE_SIZE))
+        parts = [f"{DATA_DIR}/firehydrants_{ts}_part{n}.json.gz" for n in range(len(offsets))]
+        logger.info(f"Fetching {total} rows in {len(parts)} page(s).")
+
+        try:
+            # Download pages in parallel over the shared session's connection pool
+            # Each page is retried independently (see _api_retry) behind the shared breaker
+            with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(parts))) as executor:
+                size = sum(executor.map(_fetch_page, offsets, parts))
 
-        logger.info(f"Data saved to {filename}")
+            # Rows added after the count land past the planned pages
+            # Keep paging until a page comes back short (fewer than PAGE_SIZE rows)
+            while len(load_records(parts[-1])) == PAGE_SIZE:
+                offsets.append(offsets[-1] + PAGE_SIZE)
+                parts.append(f"{DATA_DIR}/firehydrants_{ts}_part{len(parts)}.json.gz")
+                size += _fetch_page(offsets[-1], parts[-1])
+
+            # Combine page shards into the single raw file read by validation
+            # 
+            # AWS Migration: Replace with S3 upload using boto3
+            _merge_pages(parts, filename)
+
+        except BaseException:
+            # Don't leave shards (or a half-merged file) behind in DATA_DIR
+            for path in parts + [filename]:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        logger.info(f"Data saved to {filename} ({size} bytes)")
 
         # Return file path for downstream processing
         # AWS Migration: Return S3 URI (s3://bucket/key)
         return filename
     
+    except CircuitOpen as e:
+        # ==================== CIRCUIT BREAKER OPEN ====================
+        # Recent calls kept failing, so the API is not contacted at all
+        # The alert was sent when the breaker opened
+        logger.error("Skipped API request: %s", e)
+        raise
+
     except requests.exceptions.Timeout as e:
         # ==================== TIMEOUT HANDLING ====================
-        # API took longer than 30 seconds to respond
+        # API took longer than 3 seconds to connect or stalled for 30 seconds mid-response
+        # (a stalled page body arrives here as ReadTimeout, see _fetch_page)
         # Possible causes: Network issues, API overload, maintenance
         # 
-        # AWS Migration: Implement retry logic before raising
-        # Log timeout for CloudWatch alarm creation
-        logger.error("API request timed out after 30 seconds: %s", e)
+        # Raised only after _api_retry has used up its attempts
+        # AWS Migration: Log timeout for CloudWatch alarm creation
+        logger.error("API request timed out: %s", e)
         raise
 
     except requests.exceptions.HTTPError as e:
@@ -99,6 +365,16 @@ def fetch_data():
         # Example: CloudWatch metric "API_Error_401" for auth failures
         logger.error("API returned HTTP error: %s", e)
         raise
+
+    except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+        # ==================== CONNECTION ERROR HANDLING ====================
+        # API connection failed or dropped mid-response (e.g. reset, incomplete body)
+        # Checked before IOError: requests exceptions are IOError subclasses
+        # 
+        # Raised only after _api_retry has used up its attempts
+        # AWS Migration: Log dropped connections for CloudWatch alarm creation
+        logger.error("API connection failed: %s", e)
+        raise
         
     except IOError as e:
         # ==================== FILE SYSTEM ERROR HANDLING ====================
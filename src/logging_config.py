@@ -10,6 +10,7 @@ DESCRIPTION:
     Insurance Rating ETL Pipeline. It sets up logging with a specific format that includes 
     timestamps, logger names, run identifiers, log levels, and messages. This ensures consistent 
     logging across all components of the pipeline, facilitating easier debugging and monitoring.    
+    Log records are queued and written to stdout by a single background listener thread.
 
 USAGE EXAMPLE:  
     from logging_config import setup_logging
@@ -34,8 +35,35 @@ VERSION HISTORY:
 ===================================================================================================
 """
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Run identifier stamped on every log record as %(run_id)s
+# Set by setup_logging() whenever a run_id is passed; "N/A" until then
+_run_id = "N/A"
+
+# Background log writer shared by all pipeline loggers (started on first setup_logging)
+# Loggers only put records on _log_queue; the listener thread formats them and does the
+# blocking stdout writes, so slow terminals or log agents don't stall the ETL
+_log_queue = queue.Queue(-1)
+_listener = None
+
+_default_record_factory = logging.getLogRecordFactory()
+
+
+def _record_factory(*args, **kwargs):
+    """Create a log record carrying the current run identifier."""
+    record = _default_record_factory(*args, **kwargs)
+    record.run_id = _run_id
+    return record
+
+
+# Installed once at import: run_id is set when each record is created, so no
+# filters need to be attached per logger (or re-attached on every setup call)
+logging.setLogRecordFactory(_record_factory)
 
 def setup_logging(name="hydrant_pipeline", level=logging.INFO, run_id=None):
     """
@@ -45,17 +73,13 @@ def setup_logging(name="hydrant_pipeline", level=logging.INFO, run_id=None):
     - name (str): The name of the logger.
     - level (int): The logging level (e.g., logging.INFO, logging.DEBUG).
     - run_id (str): An optional run identifier to include in log messages.
+                    Applies to records from every pipeline logger, not only this one.
     """
+    global _run_id
+
     # Add run_id to log records if provided
     if run_id:
-        class ContextFilter(logging.Filter):
-            def filter(self, record):
-                record.run_id = run_id
-                return True
-
-        logging.getLogger().addFilter(ContextFilter())
-    else:
-        logging.getLogger().addFilter(lambda record: setattr(record, 'run_id', 'N/A') or True)
+        _run_id = run_id
     
     # Configure logger
     logger = logging.getLogger(name)
@@ -63,12 +87,35 @@ def setup_logging(name="hydrant_pipeline", level=logging.INFO, run_id=None):
     # Set logging level
     logger.setLevel(level)
 
+    # Don't pass records up to ancestor loggers' handlers (avoids duplicate output)
+    logger.propagate = False
+
+    # Start the listener thread that writes queued records to the console
+    _start_listener()
+
+    # Add handler to logger if not already added
+    if not logger.handlers:
+
+        # Queue records for the listener instead of writing them inline
+        handler = QueueHandler(_log_queue)
+
+        # Set handler level
+        handler.setLevel(level)
+
+        logger.addHandler(handler)
+
+    return logger
+
+
+def _start_listener():
+    """Start the shared QueueListener once; it is stopped (and flushed) at interpreter exit."""
+    global _listener
+    if _listener is not None:
+        return
+
     # Create console handler
     handler = logging.StreamHandler(sys.stdout)
 
-    # Set handler level
-    handler.setLevel(level)
-
     # Create formatter
     formatter = logging.Formatter(
         '%(asctime)s | %(name)s | %(run_id)s | %(levelname)s | %(message)s'
@@ -77,8 +124,7 @@ def setup_logging(name="hydrant_pipeline", level=logging.INFO, run_id=None):
     # Add formatter to handler
     handler.setFormatter(formatter)
 
-    # Add handler to logger if not already added
-    if not logger.hasHandlers():
-        logger.addHandler(handler)
-
-    return logger
\ No newline at end of file
+    # AWS Migration: Add a batching CloudWatch Logs handler here alongside the console
+    _listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
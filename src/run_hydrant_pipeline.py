@@ -23,7 +23,9 @@ VERSION HISTORY:
 ====================================================================================================
 """
 import uuid
+import pyarrow.parquet as pq
 from alerts import send_alert
+from config import ensure_dirs
 from logging_config import setup_logging
 from ingestion import fetch_data    
 from validation import validate_data
@@ -41,36 +43,41 @@ logger = setup_logging(name="hydrant_pipeline", run_id=run_id)
 def run_pipeline():
     logger.info(f"Starting hydrant pipeline with run ID: {run_id}")
     try:
+      # Create local data directories once per run (see config.ensure_dirs):
+      # raw, validated, quarantine and processed; s3:// locations are skipped
+      ensure_dirs()
+
       # ==================== STAGE 1: DATA INGESTION ====================
         # Fetch raw data from Cincinnati Open Data API
         # AWS Migration: Lambda function triggered by EventBridge schedule (daily cron)
-        # Output: S3 path s3://bucket/raw/firehydrants/YYYYMMDDTHHMMSSZ.json
+        # Output: S3 path s3://bucket/raw/firehydrants/YYYYMMDDTHHMMSSZ.json.gz
       raw_file = fetch_data()
       
       # ==================== STAGE 2: DATA VALIDATION ====================
         # Validate records against expected schema and business rules
-        # Returns tuple: (list of valid records, count of invalid records)
+        # Returns tuple: (Parquet file of valid records, count of invalid records)
         # AWS Migration: Glue job with validation logic
         # Invalid records → Write to S3 quarantine bucket for investigation
-      valid, invalid_count = validate_data(raw_file)
+      valid_file, invalid_count = validate_data(raw_file)
+      valid_count = pq.read_metadata(valid_file).num_rows
 
       # Log data quality metrics for monitoring
       # AWS Migration: Publish to CloudWatch custom metric "ValidRecordCount"
-      logger.info(f"Validation complete: {valid} valid records, {invalid_count} invalid records." )
+      logger.info(f"Validation complete: {valid_count} valid records, {invalid_count} invalid records." )
 
       # ==================== DATA QUALITY GATE ====================
       # Fail pipeline if no valid data exists (prevents processing empty datasets)
        # AWS Migration: Step Functions Choice state with conditional branching
-      if not valid:
+      if valid_count == 0:
         logger.warning("No valid data to process after validation.")    
         raise ValueError("No valid data to process after validation.")
       
       # ==================== STAGE 3: DATA TRANSFORMATION ====================
       # Apply business logic and create derived features for analytics
       # AWS Migration: Glue job with transform.py logic
-      # Input: Valid records (list of dicts)
+      # Input: Validated Parquet file (only the needed columns are read)
       # Output: Pandas DataFrame with engineered features
-      df = transform_data(valid)
+      df = transform_data(valid_file)
       
       # Exit if transform produced no rows
       if df is None or df.empty:
@@ -13,8 +13,7 @@ and writes it to the specified storage location (local or S3) in a Hive-style pa
 
 AWS MIGRATION PLAN:
 - Update the `processed_dir` parameter to use S3 paths (e.g., "s3://hydrant-data-lake/processed").
-- Remove local directory creation logic as S3 does not require it.      
-- Ensure that the pandas `to_parquet` method is compatible with S3 paths.
+- s3:// paths are written via pyarrow.fs.S3FileSystem (parallel multipart upload, no local mkdir).
 - Test the function to confirm successful writing to S3 with correct partitioning.  
 
 VERSION HISTORY:
@@ -24,6 +23,21 @@ VERSION HISTORY:
 """
 
 import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from io_utils import s3_filesystem
+
+# Partition directories already created by this process (skips repeat makedirs calls)
+_MKDIR_CACHE = set()
+
+# Rows per Parquet row group (and per batch converted from pandas)
+# Row groups are the unit Athena/Spark can skip using column statistics
+ROW_GROUP_SIZE = 65536
+
+# Buffer size for S3 output streams
+# Each full buffer is sent as one multipart upload part (S3 requires parts >= 5 MiB)
+S3_BUFFER_SIZE = 8 * 1024 * 1024
+
 def save_parquet(df, processed_dir = "data/processed") -> None:
     """
     Save the transformed DataFrame to Parquet format with date-based partitioning.
@@ -54,7 +68,7 @@ def save_parquet(df, processed_dir = "data/processed") -> None:
     # Example paths:
     # Local:  data/processed/load_date=2025-01-12
     # AWS S3: s3://hydrant-data-lake/processed/load_date=2025-01-12
-    path = os.path.join(processed_dir, f"load_date={date}")
+    path = f"{processed_dir.rstrip('/')}/load_date={date}"
 
 
     # Create partition directory if it doesn't exist
@@ -63,19 +77,76 @@ def save_parquet(df, processed_dir = "data/processed") -> None:
     # - exist_ok=True: Don't raise error if directory already exists
     #   (allows overwrites for reprocessing scenarios)
     #
-    # AWS Migration: Not needed for S3 (no directory concept)
+    # Only done once per partition per process; repeat saves to the same
+    # load_date skip the stat/mkdir system calls
+    #
+    # Not needed for S3 (no directory concept)
     # S3 keys are flat namespace with "/" as delimiter
-    os.makedirs(path, exist_ok=True)
+    is_s3 = path.startswith("s3://")
+    if not is_s3 and path not in _MKDIR_CACHE:
+        os.makedirs(path, exist_ok=True)
+        _MKDIR_CACHE.add(path)
 
 
     # Write DataFrame to Parquet format
     # 
+    # The frame is converted and written ROW_GROUP_SIZE rows at a time, so only one
+    # batch exists as Arrow data at once (to_parquet converts the whole frame first)
+    # 
     # Parameters:
-    # - index=False: Exclude DataFrame index from Parquet file
+    # - preserve_index=False: Exclude DataFrame index from Parquet file
     #   (index is just row numbers, not meaningful data)    
+    # - compression='zstd': Smaller files than the default snappy at similar read speed
+    # - use_dictionary=True: Dictionary-encode columns (categoricals map straight onto this)
+    # - data_page_size=1 MiB: Target size of each encoded data page within a row group
     # File naming convention:
     # File path: {partition_dir}/firehydrants.parquet
     # Example: data/processed/load_date=2025-01-12/firehydrants.parquet
     #
-    # AWS Migration: Write directly to S3 using s3://bucket/path format
-    df.to_parquet(os.path.join(path, "firehydrants.parquet"), index=False)
\ No newline at end of file
+    # S3: s3://bucket/path is written through PyArrow's S3 filesystem as a multipart
+    # upload of S3_BUFFER_SIZE parts, sent in parallel (see io_utils.s3_filesystem)
+    #
+    # Written to a temporary file in the partition first and renamed over
+    # firehydrants.parquet only once every batch is in. A failure mid-write (the writer
+    # still emits a footer on the way out) can't leave a valid-looking partial file in
+    # place of the previous good one. The "_" prefix keeps Athena/Spark from reading it.
+    #
+    # PyArrow can't abort an S3 upload: closing the stream (which also happens on
+    # error) completes it. The temp key is what makes a failed write safe on S3 too;
+    # the partial object never appears under the published name and is deleted.
+    file_path = f"{path}/firehydrants.parquet"
+    tmp_path = f"{path}/_firehydrants.parquet.tmp"
+    if is_s3:
+        s3 = s3_filesystem()
+        sink = s3.open_output_stream(tmp_path[len("s3://"):], buffer_size=S3_BUFFER_SIZE)
+    else:
+        sink = pa.OSFile(tmp_path, "wb")
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    try:
+        with sink, pq.ParquetWriter(
+            sink,
+            schema,
+            compression="zstd",
+            use_dictionary=True,
+            data_page_size=1 << 20
+        ) as writer:
+            for start in range(0, len(df), ROW_GROUP_SIZE):
+                batch = pa.RecordBatch.from_pandas(
+                    df.iloc[start:start + ROW_GROUP_SIZE], schema=schema, preserve_index=False
+                )
+                writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+    except BaseException:
+        # Drop the partial file; the previous partition file (if any) is untouched
+        if is_s3:
+            s3.delete_file(tmp_path[len("s3://"):])
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Local: atomic rename, readers see either the old file or the new one
+    # S3: server-side copy to the final key, then the temp key is deleted
+    if is_s3:
+        s3.move(tmp_path[len("s3://"):], file_path[len("s3://"):])
+    else:
+        os.replace(tmp_path, file_path)
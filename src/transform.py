@@ -24,13 +24,149 @@ VERSION HISTORY:
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from datetime import datetime
+from types import MappingProxyType
 from logging_config import setup_logging
 
 logger = setup_logging(name="transform")
 
+# ==================== TRANSFORM CONSTANTS ====================
+# Built once at import and read-only, so transform_data does no per-call setup
 
-def transform_data(valid_records):
+# Text fields and how each is normalized
+TEXT_COLS = ('lifecyclestatus', 'servicearea', 'neighborhood')
+UPPER_COLS = ('lifecyclestatus',)
+TITLE_COLS = ('servicearea', 'neighborhood')
+
+# Operational status codes by normalized lifecyclestatus value
+# 0 = inactive (anything not listed), 1 = active, 2 = abandoned
+STATUS_MAP = MappingProxyType({'AB': 2, 'ABANDONED': 2, 'ACTIVE': 1, 'AC': 1})
+
+# Pressure band upper edges (PSI) and labels; bands are right-closed like pd.cut
+PRESSURE_EDGES = np.array([20.0, 40.0, 60.0])
+PRESSURE_EDGES.flags.writeable = False
+PRESSURE_LABELS = ('INSUFFICIENT', 'MARGINAL', 'ADEQUATE', 'EXCELLENT')
+
+# Service quality labels, in category order
+SERVICE_QUALITY_LABELS = ('UNKNOWN', 'INACTIVE', 'LOW', 'MEDIUM', 'HIGH')
+
+# Output column order: logical grouping for query optimization
+COLUMN_ORDER = (
+    # Primary identifiers (high cardinality - good for indexing)
+    'objectid', 'assetid', 'record_hash',
+    # Geographic dimensions (used in spatial joins)
+    'latitude', 'longitude', 'geo_cluster', 'neighborhood', 'servicearea',
+    # Status and measurements (frequently filtered)
+    'lifecyclestatus', 'is_active', 'staticpressure', 
+    # Derived features (used in ML models and business logic)
+    'pressure_category', 'pressure_risk_score', 'service_quality',
+    # Metadata (partition keys for S3)
+    'load_date', 'load_timestamp'
+)
+
+# Columns read from the validated Parquet file
+INPUT_COLS = ('objectid', 'assetid', 'lifecyclestatus', 'servicearea', 'staticpressure',
+              'latitude', 'longitude', 'neighborhood')
+
+# Target type of each numeric field
+NUMERIC_TYPES = MappingProxyType({
+    'objectid': pa.int64(),
+    'assetid': pa.float64(),
+    'staticpressure': pa.float64(),
+    'latitude': pa.float64(),
+    'longitude': pa.float64()
+})
+
+# Strings accepted as numbers; anything else becomes null
+# (integers are matched after a leading '+' has been dropped)
+INTEGER_PATTERN = r'^-?\d+$'
+NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+# Largest int64 magnitudes as digit strings (positive, negative); integer strings beyond
+# these become null instead of failing the cast
+INT64_MAX_DIGITS = str(2 ** 63 - 1)
+INT64_MIN_DIGITS = str(2 ** 63)
+
+
+def _to_numeric(arr, type_):
+    """
+    Parse a string column into a numeric Arrow type in one vectorized pass.
+
+    Arrow equivalent of pd.to_numeric(..., errors='coerce'): values that are not
+    numbers (e.g. "abc", "") become nulls instead of raising.
+
+    Integer targets (int64): plain integer strings are cast straight to int64, so ids
+    above 2^53 keep every digit. Integral float strings ("12.0", "1e3") are accepted too;
+    non-integral ones ("12.5") and values outside the int64 range become null.
+
+    Parameters:
+    - arr (pa.ChunkedArray): String column
+    - type_ (pa.DataType): Target numeric type
+
+    Returns:
+    - pa.ChunkedArray: Column of type_
+    """
+    arr = pc.utf8_trim_whitespace(arr)
+    null = pa.scalar(None, pa.string())
+    numbers = pc.if_else(pc.match_substring_regex(arr, NUMBER_PATTERN), arr, null)
+    if not pa.types.is_integer(type_):
+        return numbers.cast(type_)
+
+    # Exact path: integer strings ('+' dropped, since Arrow's cast rejects it)
+    numbers = pc.replace_substring_regex(numbers, r'^\+', '')
+    is_integer = pc.match_substring_regex(numbers, INTEGER_PATTERN)
+
+    # Range check on the digits (sign and leading zeros stripped): fewer than 19 digits
+    # always fits; exactly 19 fits if not above the int64 limit for its sign (equal-length
+    # digit strings compare like the numbers)
+    negative = pc.starts_with(numbers, '-')
+    digits = pc.utf8_ltrim(pc.utf8_ltrim(numbers, characters='-'), characters='0')
+    n_digits = pc.utf8_length(digits)
+    limit = pc.if_else(negative, INT64_MIN_DIGITS, INT64_MAX_DIGITS)
+    in_range = pc.or_(
+        pc.less(n_digits, len(INT64_MAX_DIGITS)),
+        pc.and_(pc.equal(n_digits, len(INT64_MAX_DIGITS)), pc.less_equal(digits, limit))
+    )
+    integers = pc.if_else(pc.and_(is_integer, in_range), numbers, null).cast(type_)
+
+    # Everything else that parsed as a number: keep it only if it is a whole number
+    # that fits the target type
+    floats = pc.if_else(is_integer, null, numbers).cast(pa.float64())
+    whole = pc.and_(pc.equal(floats, pc.floor(floats)), pc.less(pc.abs(floats), 2.0 ** 63))
+    floats = pc.if_else(whole, floats, pa.scalar(None, pa.float64()))
+    return pc.coalesce(integers, floats.cast(type_))
+
+
+def _normalize_text(arr, upper):
+    """
+    Strip and case-normalize a text column, returning it dictionary-encoded.
+
+    The column is dictionary-encoded once, then PyArrow's vectorized UTF-8 kernels
+    (trim + upper/title) run on its distinct values only (a few dozen for these fields)
+    instead of once per row; raw values that normalize to the same text (e.g. "AC" and
+    " ac") end up in the same dictionary entry.
+
+    Parameters:
+    - arr (pa.ChunkedArray): Raw text column (missing values stay missing)
+    - upper (bool): Upper-case if True, title-case otherwise
+
+    Returns:
+    - pa.DictionaryArray: Normalized column, dictionary sorted (becomes a pandas categorical)
+    """
+    encoded = pc.dictionary_encode(arr).combine_chunks()
+    normalized = pc.utf8_trim_whitespace(encoded.dictionary)
+    normalized = pc.utf8_upper(normalized) if upper else pc.utf8_title(normalized)
+    categories = pc.unique(normalized).sort()
+
+    # Map each raw dictionary index to its normalized category index
+    remap = pc.index_in(normalized, value_set=categories)
+    return pa.DictionaryArray.from_arrays(pc.take(remap, encoded.indices), categories)
+
+
+def transform_data(valid_path):
     """
     Transform validated fire hydrant records into a structured DataFrame
     for insurance rating analysis.
@@ -39,90 +175,110 @@ def transform_data(valid_records):
     Consider partitioning strategy for large datasets in S3.
     
     Parameters:
-    - valid_records (list): List of validated fire hydrant records
+    - valid_path (str): Parquet file of validated records from validate_data
+                        (every required column as a string)
     
     Returns:
     - pd.DataFrame: Transformed DataFrame ready for downstream processing
     """
-    logger.info(f"Starting transformation of {len(valid_records)} records.")
-    
-    # Convert list of dicts to pandas DataFrame for vectorized operations
-    df = pd.DataFrame(valid_records)
+    # Read only the columns transform uses from the validated Parquet file
+    table = pq.read_table(valid_path, columns=list(INPUT_COLS))
+    logger.info(f"Starting transformation of {table.num_rows} records.")
 
     # Return early if no input records
-    if df.empty:    
-        logger.error("transform_data: no valid_records provided — returning empty DataFrame.")
-        return df
+    if table.num_rows == 0:
+        logger.error("transform_data: no valid records provided — returning empty DataFrame.")
+        return table.to_pandas()
     
     # Convert string numbers to proper numeric types
     #
-    # pd.to_numeric parameters:
-    # - errors='coerce': Invalid values become NaN (e.g., "abc" -> NaN)
+    # Parsed column-at-a-time in Arrow (see _to_numeric):
+    # - Invalid values become null (e.g., "abc" -> NaN), like pd.to_numeric(errors='coerce')
     # - This allows data to flow through; NaNs handled by imputation below
     logger.info("Converting data types from API strings to proper types...")
-    
-    df['objectid'] = pd.to_numeric(df['objectid'], errors='coerce').astype('Int64')  # Int64 allows NaN
-    df['assetid'] = pd.to_numeric(df['assetid'], errors='coerce')
-    df['staticpressure'] = pd.to_numeric(df['staticpressure'], errors='coerce')
-    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-    
-    # Ensure text fields are strings (convert if needed)
-    df['lifecyclestatus'] = df['lifecyclestatus'].astype(str)
-    df['servicearea'] = df['servicearea'].astype(str)
-    df['neighborhood'] = df['neighborhood'].astype(str)
+    for col, type_ in NUMERIC_TYPES.items():
+        table = table.set_column(table.schema.get_field_index(col), col, _to_numeric(table[col], type_))
+
+    # Normalize text fields for consistent analytics and joins
+    # Prevents case-sensitivity issues in SQL queries and group-by operations
+    #
+    # Done in Arrow (see _normalize_text) and kept dictionary-encoded: the columns arrive
+    # in pandas as categoricals (int codes + small lookup table), so later lookups run once
+    # per category instead of once per row, and Parquet writes them as dictionary-encoded
+    # columns (smaller files, faster Athena scans)
+    for col in TEXT_COLS:
+        table = table.set_column(
+            table.schema.get_field_index(col), col, _normalize_text(table[col], upper=col in UPPER_COLS)
+        )
+
+    # Convert to pandas DataFrame for vectorized operations
+    # objectid stays a nullable Int64 (Int64 allows NaN); other numerics become float64
+    df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
     
 
     # Add load metadata for data lineage and incremental processing
     # AWS Note: Use partition columns (load_date) for efficient S3 queries via Athena
-    df['load_date'] = pd.to_datetime(datetime.utcnow().date())
-    df['load_timestamp'] = datetime.utcnow()
-    
-    # Standardize column names to match data lake conventions
-    # AWS Best Practice: lowercase with underscores for Glue/Athena compatibility
-    df.columns = df.columns.str.lower().str.strip()
-    
-    # Normalize text fields for consistent analytics and joins
-    # Prevents case-sensitivity issues in SQL queries and group-by operations
-    df['lifecyclestatus'] = df['lifecyclestatus'].str.strip().str.upper()
-    df['servicearea'] = df['servicearea'].str.strip().str.title()
-    df['neighborhood'] = df['neighborhood'].str.strip().str.title()
+    # One clock read for both columns, assigned as NumPy scalars (no datetime parsing);
+    # load_date is the same instant truncated to the day
+    load_timestamp = np.datetime64(datetime.utcnow(), 'us')
+    df['load_date'] = load_timestamp.astype('datetime64[D]')
+    df['load_timestamp'] = load_timestamp
     
     # ==================== INSURANCE SPECIFIC ====================
+    # Pressure readings as a float64 array (NaN = missing), shared by the features below
+    pressure = df['staticpressure'].to_numpy(dtype='float64', na_value=np.nan)
+
     # 1. PRESSURE ADEQUACY CLASSIFICATION
     # Categorize hydrants by fire suppression capability
     # Business Context: Fire departments require 20+ PSI; 40-60 PSI is optimal
     # Used by: Underwriting models, risk scoring algorithms
-    df['pressure_category'] = pd.cut(
-        df['staticpressure'],
-        bins=[-float('inf'), 20, 40, 60, float('inf')],
-        labels=['INSUFFICIENT', 'MARGINAL', 'ADEQUATE', 'EXCELLENT']
-    )
+    # 
+    # Bands are right-closed like pd.cut: <=20, (20, 40], (40, 60], >60 PSI
+    # searchsorted(side='left') returns each band's index directly as the category code;
+    # missing pressure gets code -1 (NaN)
+    codes = np.searchsorted(PRESSURE_EDGES, pressure, side='left').astype('int8')
+    codes[np.isnan(pressure)] = -1
+    df['pressure_category'] = pd.Categorical.from_codes(codes, categories=PRESSURE_LABELS, ordered=True)
     
     # 2. OPERATIONAL STATUS FLAG
     # 0 = inactive, 1 = active, 2 = abandoned
     # Used by: Coverage gap analysis, risk heat maps
-    df['is_active'] = np.where(
-        df['lifecyclestatus'].isin(['AB', 'ABANDONED']), 2,
-        np.where(df['lifecyclestatus'].isin(['ACTIVE', 'AC']), 1, 0)
-    )
+    # Looked up once per category, then broadcast to rows through the category codes
+    # (the trailing 0 is picked up by code -1, i.e. a missing status)
+    status = df['lifecyclestatus'].cat
+    lookup = np.array([STATUS_MAP.get(c, 0) for c in status.categories] + [0], dtype='int8')
+    df['is_active'] = lookup[status.codes.to_numpy()]
 
     # 3. PRESSURE RISK SCORE
     # Quantitative risk metric where higher score = higher risk
     # Formula: Inverse normalized pressure (0-100 scale)
     # Used by: Premium calculations, property risk scoring
+    # Missing pressure scores 100 (highest risk)
+    #
+    # Computed in NumPy with the same arithmetic as before; the NaN -> 100 mapping is applied
+    # to the result, so it also covers 0 / 0 when the max pressure is 0 (or all missing)
     max_pressure = df['staticpressure'].max()
-    df['pressure_risk_score'] = 100 - (df['staticpressure'] / max_pressure * 100)
-    df['pressure_risk_score'] = df['pressure_risk_score'].fillna(100).round(2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = 100.0 - pressure / max_pressure * 100.0
+    df['pressure_risk_score'] = np.where(np.isnan(score), 100.0, np.round(score, 2))
     
     # 4. GEOGRAPHIC CLUSTERING
     # Create spatial grid cells for proximity analysis
     # ~111 meters precision at 3 decimal places
     # Used by: Nearest neighbor searches, coverage density calculations
-    df['geo_cluster'] = (
-        df['latitude'].round(3).astype(str) + '_' + 
-        df['longitude'].round(3).astype(str)
-    )
+    #
+    # Encoded as one int64 grid key instead of a "lat_lon" string:
+    # - High 32 bits: latitude in thousandths of a degree (round(lat, 3) * 1000)
+    # - Low 32 bits: longitude in thousandths of a degree (two's complement)
+    # - Decode: lat = (key >> 32) / 1000, lon = int32(key & 0xFFFFFFFF) / 1000
+    # - Missing latitude or longitude -> <NA>
+    # AWS Note: Expose the "lat_lon" string form through an Athena view if needed
+    lat = np.rint(df['latitude'].to_numpy() * 1000)
+    lon = np.rint(df['longitude'].to_numpy() * 1000)
+    missing = np.isnan(lat) | np.isnan(lon)
+    lat_key = np.where(missing, 0, lat).astype(np.int64)
+    lon_key = np.where(missing, 0, lon).astype(np.int64)
+    df['geo_cluster'] = pd.arrays.IntegerArray((lat_key << 32) | (lon_key & 0xFFFFFFFF), missing)
     
     # 5. SERVICE QUALITY COMPOSITE INDICATOR
     # Combines operational status with pressure adequacy
@@ -132,11 +288,22 @@ def transform_data(valid_records):
     #   - LOW: Active + Pressure < 20 PSI
     #   - INACTIVE: Not in service
     # Used by: Underwriting decisioning, risk tier assignment
-    df['service_quality'] = 'UNKNOWN'
-    df.loc[(df['is_active'] == 1) & (df['staticpressure'] >= 40), 'service_quality'] = 'HIGH'
-    df.loc[(df['is_active'] == 1) & (df['staticpressure'].between(20, 40)), 'service_quality'] = 'MEDIUM'
-    df.loc[(df['is_active'] == 1) & (df['staticpressure'] < 20), 'service_quality'] = 'LOW'
-    df.loc[df['is_active'] == 0, 'service_quality'] = 'INACTIVE'
+    # 
+    # Classified in one np.select pass (first matching condition wins):
+    # - Exactly 40 PSI stays MEDIUM, matching the 20-40 PSI MARGINAL pressure band
+    # - Missing pressure on an active hydrant matches no condition -> UNKNOWN
+    # - Abandoned hydrants (is_active == 2) -> UNKNOWN
+    active = df['is_active'].to_numpy()
+    in_service = active == 1
+    # 
+    # Choices are category codes (positions in SERVICE_QUALITY_LABELS), so the result
+    # is built straight from an int8 array without creating or hashing label strings
+    codes = np.select(
+        [active == 0, in_service & (pressure > 40), in_service & (pressure >= 20), in_service & (pressure < 20)],
+        [1, 4, 3, 2],   # INACTIVE, HIGH, MEDIUM, LOW
+        default=0       # UNKNOWN
+    ).astype('int8')
+    df['service_quality'] = pd.Categorical.from_codes(codes, categories=SERVICE_QUALITY_LABELS)
     
     # Impute missing pressure values with median (robust to outliers)
     # AWS Note: Track imputation rate as data quality metric in CloudWatch
@@ -145,26 +312,16 @@ def transform_data(valid_records):
     # Create deterministic hash for record identification
     # Used by: Change data capture (CDC), upsert operations in data lake
     # AWS Note: Enables efficient deduplication in Glue or EMR jobs
+    #
+    # Kept as the raw uint64 (8 bytes per row) rather than its decimal string form;
+    # the values are unchanged, only the storage type differs
     df['record_hash'] = pd.util.hash_pandas_object(
         df[['objectid', 'latitude', 'longitude']], 
         index=False
-    ).astype(str)
-    
-    # Reorder columns for logical grouping and query optimization
-    column_order = [
-        # Primary identifiers (high cardinality - good for indexing)
-        'objectid', 'assetid', 'record_hash',
-        # Geographic dimensions (used in spatial joins)
-        'latitude', 'longitude', 'geo_cluster', 'neighborhood', 'servicearea',
-        # Status and measurements (frequently filtered)
-        'lifecyclestatus', 'is_active', 'staticpressure', 
-        # Derived features (used in ML models and business logic)
-        'pressure_category', 'pressure_risk_score', 'service_quality',
-        # Metadata (partition keys for S3)
-        'load_date', 'load_timestamp'
-    ]
+    )
     
-    df = df[column_order]
+    # Reorder columns for logical grouping and query optimization (see COLUMN_ORDER)
+    df = df[list(COLUMN_ORDER)]
     
     # Log transformation metrics for observability
     # AWS Migration: Send these to CloudWatch Metrics for monitoring
@@ -20,13 +20,24 @@ VERSION HISTORY:
 ====================================================================================================
 """
 
-import json
+import gc
+import os
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from config import QUARANTINE_DIR, VALIDATED_DIR
+from io_utils import load_records, s3_filesystem
 
 # VALIDATION SCOPE:
 # This module only checks that required columns exist (schema completeness).
-# Type conversions and null handling are performed in transform.py using pandas.
+# A required column present with an explicit null value still counts as present
+# (see the re-check in validate_data). Type conversions and null imputation are
+# performed in transform.py with PyArrow compute (_to_numeric) and pandas.
 
-REQUIRED_COLS = [
+# Tuple: read-only at module scope, like the transform constants
+REQUIRED_COLS = (
     "objectid",
     "assetid",
     "lifecyclestatus",
@@ -35,15 +46,33 @@ REQUIRED_COLS = [
     "latitude",
     "longitude",
     "neighborhood"
-]
+)
 
+# Same columns as a frozenset, for the one-shot subset test in validate()
+REQUIRED_SET = frozenset(REQUIRED_COLS)
 
-def validate(record):
+# Arrow schema of the validated table: every required column, as a string
+# The API sends every value as a JSON string (see _load_table for records that don't)
+SCHEMA = pa.schema([(col, pa.string()) for col in REQUIRED_COLS])
+
+# Arrow schema of the quarantine table (one row per invalid record)
+# - raw: The record as received, re-serialized to JSON bytes
+# - missing_columns: Required columns the record lacks
+QUARANTINE_SCHEMA = pa.schema([
+    ('raw', pa.binary()),
+    ('missing_columns', pa.list_(pa.string()))
+])
+
+# Rows per row group in the validated Parquet file handed to transform
+VALIDATED_ROW_GROUP_SIZE = 100_000
+
+
+def validate(record: dict) -> bool:
     """
     Validate a single fire hydrant record for schema completeness.
     
     This function only checks that all required columns are present.
-    It does NOT validate types - that's handled in transform.py with pandas.
+    It does NOT validate types - that's handled in transform.py (_to_numeric).
    
     Parameters:
     - record (dict): Single hydrant record from API (JSON object)
@@ -56,70 +85,157 @@ def validate(record):
 
     # Check if all required columns exist in the record
     # Missing columns indicate schema drift or API changes
-    for col in REQUIRED_COLS:
-        if col not in record:
-            return False  # Fail validation: required column missing
-    
-    # All required columns present
-    return True
+    # 
+    # dict.keys() is set-like: ">=" probes each required column in C
+    # (no per-column Python loop or branch)
+    return record.keys() >= REQUIRED_SET
 
 
-def validate_data(file_path):
+def _load_table(records: list) -> pa.Table:
+    """
+    Load records into an Arrow table with the fixed string SCHEMA.
+
+    A missing column becomes null. Values that are JSON strings convert directly;
+    a record holding a JSON number (or other non-string) is still valid, so if the
+    direct conversion fails those values are stringified first, like the old astype(str).
+
+    Parameters:
+    - records (list): Parsed records (list of dicts)
+
+    Returns:
+    - pa.Table: Table with SCHEMA (fields outside SCHEMA are dropped)
+    """
+    try:
+        return pa.Table.from_pylist(records, schema=SCHEMA)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        names = SCHEMA.names
+        records = [
+            {name: value if value is None or isinstance(value, str) else str(value)
+             for name, value in ((name, record.get(name)) for name in names)}
+            for record in records
+        ]
+        return pa.Table.from_pylist(records, schema=SCHEMA)
+
+
+def _quarantine_table(records: list) -> pa.Table:
+    """
+    Build the quarantine table for invalid records.
+
+    Parameters:
+    - records (list): Invalid records (list of dicts)
+
+    Returns:
+    - pa.Table: Table with QUARANTINE_SCHEMA
+    """
+    return pa.table({
+        'raw': [orjson.dumps(record) for record in records],
+        'missing_columns': [[col for col in REQUIRED_COLS if col not in record] for record in records]
+    }, schema=QUARANTINE_SCHEMA)
+
+
+def validate_data(file_path: str) -> tuple[str, int]:
     """
     Validate all records in a JSON file for schema completeness.
     
     This function reads raw JSON data from ingestion and checks that each record
     has all required columns. Records with missing columns are counted as invalid.
+    The check runs column-at-a-time on an Arrow table rather than record-at-a-time.
+    Valid records are written to a Parquet file in VALIDATED_DIR for the transform step,
+    so it reads typed columns instead of re-parsing JSON or a list of dicts. Invalid
+    records, with the columns each one lacks, go to an Arrow IPC file in QUARANTINE_DIR.
    
     Parameters:
     - file_path (str): Path to JSON file from ingestion step
-                       Local: "data/raw/firehydrants_20250112T143000Z.json"
-                       AWS: S3 key from event payload
+                       Local: "data/raw/firehydrants_20250112T143000Z.json.gz"
+                       AWS: s3:// URI from event payload (e.g. "s3://bucket/raw/...json.gz")
     
     Returns:
-    - tuple: (valid_records, invalid_count)
-        - valid_records (list): List of dicts with complete schema
+    - tuple: (valid_path, invalid_count)
+        - valid_path (str): Parquet file of records with complete schema
+                            (SCHEMA: required columns as strings)
+                            Example: "data/validated/firehydrants_20250112T143000Z.parquet"
         - invalid_count (int): Number of records missing required columns
     
     Data Quality Metrics (for CloudWatch):
-    - Validation Rate = len(valid_records) / (len(valid_records) + invalid_count)
+    - Valid Record Count = pq.read_metadata(valid_path).num_rows
     - Invalid Record Count = invalid_count
-    - Total Record Count = len(valid_records) + invalid_count
+    - Validation Rate = valid count / (valid count + invalid_count)
     
     """
-    # Initialize containers for categorizing records
-    valid_records = []    # Accumulator for records with complete schema
-    invalid_count = 0     # Counter for records missing required columns
-    
-
     # Read raw JSON file from ingestion step
     # Expected format: List of JSON objects (one per hydrant)
+    # Parsed with orjson from bytes (see io_utils.load_records)
     # 
-    # AWS Migration: Replace with S3 get_object
-    # response = s3.get_object(Bucket=bucket, Key=key)
-    # data = json.loads(response['Body'].read().decode('utf-8'))
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    # AWS: s3:// paths are fetched with parallel ranged GETs (see io_utils._read_s3)
+    # 
+    # The cyclic GC is paused while the records are parsed and converted: every parsed
+    # dict is a tracked container, so otherwise a collection pass re-walks the growing
+    # list again and again, though nothing here can form a reference cycle
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        data = load_records(file_path)
+        table = _load_table(data)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
     
 
-    # Iterate through each record and check schema completeness
+    # Check schema completeness one column at a time
     # 
-    # This loop is the data quality gate for schema:
+    # This mask is the data quality gate for schema:
     # - Complete schema → Pass to transformation
     # - Incomplete schema → Count as invalid (missing columns)
-    for record in data:
-        if validate(record):
-            # Record has all required columns (types will be fixed in transform)
-            valid_records.append(record)
+    # 
+    # A missing column loads as null, so a row passes if every required column is non-null
+    valid_mask = pc.is_valid(table[REQUIRED_COLS[0]])
+    for col in REQUIRED_COLS[1:]:
+        valid_mask = pc.and_(valid_mask, pc.is_valid(table[col]))
+    valid_mask = valid_mask.to_numpy(zero_copy_only=False)
+
+    # A column present with an explicit null value is not missing: re-check the few
+    # failing rows against the record itself (validate() only looks at the keys)
+    invalid_records = []
+    for i in np.flatnonzero(~valid_mask):
+        if validate(data[i]):
+            valid_mask[i] = True
         else:
-            # Record missing one or more required columns
-            invalid_count += 1
-            
-            # AWS Migration: Write to quarantine bucket
-            # Store with details about which column(s) are missing (future enhancement)
+            invalid_records.append(data[i])
     
+    valid = table.filter(valid_mask)
+    invalid_count = len(invalid_records)
 
-    # Return valid records for transformation and count of invalid records
-    return valid_records, invalid_count
+    # Output files are named after the raw file
+    # Example: data/raw/firehydrants_20250112T143000Z.json.gz
+    #       -> data/validated/firehydrants_20250112T143000Z.parquet
+    #       -> data/quarantine/firehydrants_20250112T143000Z.arrow
+    name = os.path.basename(file_path).split('.')[0]
+
+
+    # Quarantine invalid records for investigation
+    # 
+    # Written as an Arrow IPC (Feather v2) file: consumers such as a data quality
+    # dashboard can memory-map it and read the columns without deserializing anything
+    # Only written when the run has invalid records
+    # 
+    # One object per run holds every invalid record, so an s3:// QUARANTINE_DIR costs a
+    # single upload per run rather than one PUT per record
+    if invalid_records:
+        quarantine_path = f"{QUARANTINE_DIR}/{name}.arrow"
+        if quarantine_path.startswith("s3://"):
+            sink = s3_filesystem().open_output_stream(quarantine_path[len("s3://"):])
+        else:
+            sink = pa.OSFile(quarantine_path, "wb")
+        with sink, pa.ipc.new_file(sink, QUARANTINE_SCHEMA) as writer:
+            writer.write_table(_quarantine_table(invalid_records))
+
+
+    # Hand valid records to transform as Parquet
+    # 
+    # AWS Migration: Write to s3://bucket/validated/ (same key scheme)
+    valid_path = f"{VALIDATED_DIR}/{name}.parquet"
+    pq.write_table(valid, valid_path, compression='zstd', row_group_size=VALIDATED_ROW_GROUP_SIZE)
 
 
+    # Return validated file for transformation and count of invalid records
+    return valid_path, invalid_count